@@ -0,0 +1,300 @@
+import argparse
+import gzip
+import json
+import os
+import sqlite3
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import boto3
+import pymysql
+
+
+COLUMNS = (
+    "id", "user_id", "email_type", "email_subject",
+    "verification_link", "expires_at", "status", "sent_at",
+)
+CHECKPOINT_KEY = "email_tracking/_checkpoint.json"
+# Rows written before store_email_details set sent_at have it NULL; expires_at is
+# always set, two minutes after the send.
+AGE_COLUMN = "COALESCE(sent_at, expires_at)"
+
+RETENTION_DAYS = int(os.getenv('EMAIL_TRACKING_RETENTION_DAYS', 30))
+ARCHIVE_BUCKET = os.getenv('ARCHIVE_S3_BUCKET')
+ARCHIVE_PREFIX = os.getenv('ARCHIVE_S3_PREFIX', 'archive/')
+
+
+class S3Sink:
+    """
+    Writes archive files and the checkpoint under a prefix of an S3 bucket.
+    Objects are encrypted by the bucket's default KMS key (s3_kms_key).
+    """
+
+    def __init__(self, bucket, prefix=""):
+        self.bucket = bucket
+        self.prefix = prefix
+        self.s3_client = boto3.client('s3', region_name=os.getenv('AWS_REGION'))
+
+    def put_file(self, key, fileobj):
+        self.s3_client.upload_fileobj(
+            fileobj,
+            self.bucket,
+            self.prefix + key,
+            ExtraArgs={"ContentType": "application/gzip"}
+        )
+
+    def open_file(self, key):
+        return self.s3_client.get_object(Bucket=self.bucket, Key=self.prefix + key)['Body']
+
+    def read_json(self, key):
+        try:
+            response = self.s3_client.get_object(Bucket=self.bucket, Key=self.prefix + key)
+        except self.s3_client.exceptions.NoSuchKey:
+            return None
+        return json.loads(response['Body'].read())
+
+    def write_json(self, key, data):
+        self.s3_client.put_object(
+            Bucket=self.bucket,
+            Key=self.prefix + key,
+            Body=json.dumps(data).encode('utf-8')
+        )
+
+
+class LocalSink:
+    """Writes archive files and the checkpoint to a local directory."""
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def _path(self, key):
+        path = os.path.join(self.directory, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        return path
+
+    def put_file(self, key, fileobj):
+        with open(self._path(key), 'wb') as f:
+            while True:
+                block = fileobj.read(1024 * 1024)
+                if not block:
+                    break
+                f.write(block)
+
+    def open_file(self, key):
+        return open(os.path.join(self.directory, key), 'rb')
+
+    def read_json(self, key):
+        path = os.path.join(self.directory, key)
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            return json.load(f)
+
+    def write_json(self, key, data):
+        path = self._path(key)
+        with open(path + ".tmp", 'w') as f:
+            json.dump(data, f)
+        os.replace(path + ".tmp", path)
+
+
+def _placeholder(connection):
+    return "?" if isinstance(connection, sqlite3.Connection) else "%s"
+
+
+def _server_side_cursor(connection):
+    """Return a cursor that streams rows instead of buffering the whole result."""
+    if isinstance(connection, sqlite3.Connection):
+        return connection.cursor()
+    return connection.cursor(pymysql.cursors.SSCursor)
+
+
+def _to_json(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+def _archive_chunk(connection, sink, after_id, cutoff, chunk_size, fetch_size):
+    """
+    Stream up to chunk_size rows past after_id into one NDJSON-gzip file.
+    Returns the pending checkpoint entry and the archived ids, or None when
+    nothing is left.
+    """
+    ph = _placeholder(connection)
+    query = (
+        f"SELECT {', '.join(COLUMNS)} FROM email_tracking "
+        f"WHERE id > {ph} AND {AGE_COLUMN} < {ph} ORDER BY id LIMIT {ph}"
+    )
+    ids = []
+
+    with tempfile.TemporaryFile() as raw:
+        with gzip.GzipFile(fileobj=raw, mode='wb', compresslevel=6, mtime=0) as gz:
+            cursor = _server_side_cursor(connection)
+            try:
+                cursor.execute(query, (after_id, cutoff, chunk_size))
+                while True:
+                    batch = cursor.fetchmany(fetch_size)
+                    if not batch:
+                        break
+                    lines = [json.dumps(dict(zip(COLUMNS, row)), default=_to_json) for row in batch]
+                    gz.write(("\n".join(lines) + "\n").encode('utf-8'))
+                    ids.extend(row[0] for row in batch)
+            finally:
+                cursor.close()
+
+        if not ids:
+            return None
+
+        key = f"email_tracking/{ids[0]:020d}-{ids[-1]:020d}.ndjson.gz"
+        raw.seek(0)
+        sink.put_file(key, raw)
+        print(f"Archived {len(ids)} email_tracking rows to {key}")
+
+    return {"after_id": after_id, "last_id": ids[-1], "key": key, "rows": len(ids)}, ids
+
+
+def _archived_ids(sink, key):
+    """Read back the ids stored in an archive file."""
+    with gzip.GzipFile(fileobj=sink.open_file(key), mode='rb') as gz:
+        return [json.loads(line)["id"] for line in gz]
+
+
+def _delete_ids(connection, ids, delete_batch_size):
+    """
+    Delete exactly the archived ids, in short transactions to avoid long locks.
+    Deleting by id rather than by range keeps rows that entered the range after
+    the SELECT (a late-committed auto-increment id) until they are archived.
+    """
+    for start in range(0, len(ids), delete_batch_size):
+        batch = ids[start:start + delete_batch_size]
+        ph = _placeholder(connection)
+        cursor = connection.cursor()
+        try:
+            cursor.execute(f"DELETE FROM email_tracking WHERE id IN ({', '.join([ph] * len(batch))})", batch)
+        finally:
+            cursor.close()
+        connection.commit()
+
+
+def archive_email_tracking(connection, sink, retention_days=RETENTION_DAYS, chunk_size=50000,
+                           fetch_size=1000, delete_batch_size=1000, max_chunks=None, deadline=None):
+    """
+    Move email_tracking rows older than retention_days to the sink and delete them.
+    Progress is checkpointed in the sink after each chunk, so an interrupted run
+    resumes where it stopped; a run that reaches the end starts the next one from
+    the beginning of the table. Returns the number of rows archived by this run.
+    """
+    cutoff = (datetime.utcnow() - timedelta(days=retention_days)).strftime("%Y-%m-%d %H:%M:%S")
+    checkpoint = sink.read_json(CHECKPOINT_KEY) or {"last_id": 0}
+
+    # A previous run uploaded a file but did not finish deleting its rows.
+    pending = checkpoint.get("pending")
+    if pending:
+        print(f"Resuming deletion of rows archived in {pending['key']}")
+        _delete_ids(connection, _archived_ids(sink, pending["key"]), delete_batch_size)
+        checkpoint = {"last_id": pending["last_id"]}
+        sink.write_json(CHECKPOINT_KEY, checkpoint)
+
+    archived = 0
+    chunks = 0
+    finished = False
+    while max_chunks is None or chunks < max_chunks:
+        if deadline is not None and time.monotonic() >= deadline:
+            print("Archival time budget exhausted; stopping at checkpoint.")
+            break
+
+        result = _archive_chunk(connection, sink, checkpoint["last_id"], cutoff, chunk_size, fetch_size)
+        if result is None:
+            finished = True
+            break
+        pending, ids = result
+        sink.write_json(CHECKPOINT_KEY, {"last_id": checkpoint["last_id"], "pending": pending})
+        _delete_ids(connection, ids, delete_batch_size)
+        checkpoint = {"last_id": pending["last_id"]}
+        sink.write_json(CHECKPOINT_KEY, checkpoint)
+
+        archived += pending["rows"]
+        chunks += 1
+        if pending["rows"] < chunk_size:
+            finished = True
+            break
+
+    if finished and checkpoint["last_id"]:
+        sink.write_json(CHECKPOINT_KEY, {"last_id": 0})
+    print(f"Archived {archived} email_tracking rows older than {cutoff}.")
+    return archived
+
+
+def connect_rds():
+    """Connect to RDS with the KMS-encrypted credentials used by the notification Lambda."""
+    import lambda_function
+    # Only the database credentials; this job never sends email.
+    return pymysql.connect(
+        host=lambda_function.RDS_HOST,
+        user=lambda_function.decrypt_kms(lambda_function.RDS_USER_ENCRYPTED),
+        password=lambda_function.decrypt_kms(lambda_function.RDS_PASSWORD_ENCRYPTED),
+        database=lambda_function.RDS_DATABASE
+    )
+
+
+def lambda_handler(event, context):
+    print("Email tracking archival triggered.")
+    connection = None
+    try:
+        connection = connect_rds()
+        # Leave a minute to upload the last checkpoint before Lambda times out.
+        deadline = time.monotonic() + context.get_remaining_time_in_millis() / 1000 - 60
+        archived = archive_email_tracking(
+            connection,
+            S3Sink(ARCHIVE_BUCKET, ARCHIVE_PREFIX),
+            retention_days=int(event.get("retention_days", RETENTION_DAYS)),
+            deadline=deadline
+        )
+        return {
+            "statusCode": 200,
+            "body": json.dumps({"archived": archived})
+        }
+    except Exception as e:
+        print(f"Error occurred: {e}")
+        return {
+            "statusCode": 500,
+            "body": json.dumps(f"Internal Server Error: {str(e)}")
+        }
+    finally:
+        if connection:
+            connection.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Archive old email_tracking rows and delete them from the database.")
+    parser.add_argument("--sqlite", help="Archive from a SQLite file instead of RDS")
+    parser.add_argument("--output-dir", help="Write archives to a local directory instead of S3")
+    parser.add_argument("--bucket", default=ARCHIVE_BUCKET)
+    parser.add_argument("--prefix", default=ARCHIVE_PREFIX)
+    parser.add_argument("--retention-days", type=int, default=RETENTION_DAYS)
+    parser.add_argument("--chunk-size", type=int, default=50000)
+    parser.add_argument("--delete-batch-size", type=int, default=1000)
+    parser.add_argument("--max-chunks", type=int)
+    args = parser.parse_args()
+
+    if not args.output_dir and not args.bucket:
+        parser.error("either --output-dir or --bucket (ARCHIVE_S3_BUCKET) is required")
+
+    connection = sqlite3.connect(args.sqlite) if args.sqlite else connect_rds()
+    sink = LocalSink(args.output_dir) if args.output_dir else S3Sink(args.bucket, args.prefix)
+    try:
+        archive_email_tracking(
+            connection,
+            sink,
+            retention_days=args.retention_days,
+            chunk_size=args.chunk_size,
+            delete_batch_size=args.delete_batch_size,
+            max_chunks=args.max_chunks
+        )
+    finally:
+        connection.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+"""
+Benchmark archive_email_tracking against a local SQLite copy of email_tracking.
+
+    python benchmark_archive_email_tracking.py --rows 2000000
+"""
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from archive_email_tracking import LocalSink, archive_email_tracking
+
+
+SCHEMA = """
+CREATE TABLE email_tracking (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL,
+    email_type VARCHAR(255) NOT NULL,
+    email_subject VARCHAR(255),
+    verification_link VARCHAR(255) NOT NULL UNIQUE,
+    expires_at DATETIME NOT NULL,
+    status VARCHAR(8) NOT NULL,
+    sent_at DATETIME
+)
+"""
+
+
+def build_fixture(path, rows, retention_days, old_fraction):
+    connection = sqlite3.connect(path)
+    connection.execute(SCHEMA)
+    now = datetime.utcnow()
+    old_rows = int(rows * old_fraction)
+    batch = []
+    for i in range(rows):
+        if i < old_rows:
+            sent_at = now - timedelta(days=retention_days + 1, seconds=old_rows - i)
+        else:
+            sent_at = now - timedelta(seconds=rows - i)
+        batch.append((
+            i % 50000 + 1,
+            "verification",
+            "Verify Your Email Address",
+            f"http://example.com/v1/verify?token={i:064x}",
+            (sent_at + timedelta(minutes=2)).strftime("%Y-%m-%d %H:%M:%S.%f"),
+            "pending",
+            # Rows from before store_email_details set sent_at only have expires_at
+            None if i < old_rows else sent_at.strftime("%Y-%m-%d %H:%M:%S.%f"),
+        ))
+        if len(batch) == 100000:
+            connection.executemany(
+                "INSERT INTO email_tracking (user_id, email_type, email_subject, verification_link, "
+                "expires_at, status, sent_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                batch
+            )
+            batch = []
+    if batch:
+        connection.executemany(
+            "INSERT INTO email_tracking (user_id, email_type, email_subject, verification_link, "
+            "expires_at, status, sent_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            batch
+        )
+    connection.commit()
+    return connection, old_rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=2000000)
+    parser.add_argument("--old-fraction", type=float, default=0.9)
+    parser.add_argument("--retention-days", type=int, default=30)
+    parser.add_argument("--chunk-size", type=int, default=50000)
+    parser.add_argument("--delete-batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        print(f"Building fixture with {args.rows} rows...")
+        connection, old_rows = build_fixture(
+            os.path.join(workdir, "bench.db"), args.rows, args.retention_days, args.old_fraction
+        )
+
+        start = time.perf_counter()
+        archived = archive_email_tracking(
+            connection,
+            LocalSink(os.path.join(workdir, "archive")),
+            retention_days=args.retention_days,
+            chunk_size=args.chunk_size,
+            delete_batch_size=args.delete_batch_size
+        )
+        elapsed = time.perf_counter() - start
+
+        remaining = connection.execute("SELECT COUNT(*) FROM email_tracking").fetchone()[0]
+        connection.close()
+        archive_bytes = sum(
+            os.path.getsize(os.path.join(root, name))
+            for root, _, names in os.walk(os.path.join(workdir, "archive"))
+            for name in names
+        )
+
+    assert archived == old_rows, f"expected {old_rows} archived rows, got {archived}"
+    assert remaining == args.rows - old_rows
+    print(f"Archived {archived} rows in {elapsed:.2f}s ({archived / elapsed:,.0f} rows/s), "
+          f"{archive_bytes / 1024 / 1024:.1f} MiB compressed, {remaining} rows kept")
+
+
+if __name__ == '__main__':
+    main()
@@ -167,12 +167,13 @@ def store_email_details(user_id, email_type, email_subject, verification_link):
         print("Connected to RDS.")
         with connection.cursor() as cursor:
             query = """
-            INSERT INTO email_tracking (user_id, email_type, email_subject, verification_link, expires_at, status)
-            VALUES (%s, %s, %s, %s, %s, %s)
+            INSERT INTO email_tracking (user_id, email_type, email_subject, verification_link, expires_at, status, sent_at)
+            VALUES (%s, %s, %s, %s, %s, %s, %s)
             """
-            expiration_time = datetime.utcnow() + timedelta(minutes=2)
+            sent_at = datetime.utcnow()
+            expiration_time = sent_at + timedelta(minutes=2)
             print(f"Executing query: {query}")
-            cursor.execute(query, (user_id, email_type, email_subject, verification_link, expiration_time, 'pending'))
+            cursor.execute(query, (user_id, email_type, email_subject, verification_link, expiration_time, 'pending', sent_at))
             connection.commit()
             print(f"Email tracking record inserted for user_id: {user_id}")
     except pymysql.MySQLError as e:
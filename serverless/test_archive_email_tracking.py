@@ -0,0 +1,143 @@
+import gzip
+import json
+import os
+import sqlite3
+from datetime import datetime
+
+import pytest
+
+import archive_email_tracking as archiver
+from archive_email_tracking import CHECKPOINT_KEY, LocalSink, archive_email_tracking
+
+# Matches the MySQL DDL: sent_at has no server default
+SCHEMA = """
+CREATE TABLE email_tracking (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL,
+    email_type VARCHAR(255) NOT NULL,
+    email_subject VARCHAR(255),
+    verification_link VARCHAR(255) NOT NULL UNIQUE,
+    expires_at DATETIME NOT NULL,
+    status VARCHAR(8) NOT NULL,
+    sent_at DATETIME
+)
+"""
+
+OLD = datetime(2020, 1, 1)
+
+
+@pytest.fixture
+def connection(tmp_path):
+    connection = sqlite3.connect(str(tmp_path / "email_tracking.db"))
+    connection.execute(SCHEMA)
+    yield connection
+    connection.close()
+
+
+@pytest.fixture
+def sink(tmp_path):
+    return LocalSink(str(tmp_path / "archive"))
+
+
+def insert_rows(connection, ids, expires_at=OLD):
+    # Same columns as the INSERT in lambda_function.store_email_details before it set sent_at
+    connection.executemany(
+        "INSERT INTO email_tracking (id, user_id, email_type, email_subject, verification_link, expires_at, status) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+        [
+            (i, 1, "verification", "Verify Your Email Address", f"http://example.com/v1/verify?token={i}",
+             expires_at.strftime("%Y-%m-%d %H:%M:%S"), "pending")
+            for i in ids
+        ]
+    )
+    connection.commit()
+
+
+def remaining_ids(connection):
+    return [row[0] for row in connection.execute("SELECT id FROM email_tracking ORDER BY id")]
+
+
+def archived_ids(sink):
+    directory = os.path.join(sink.directory, "email_tracking")
+    ids = []
+    for name in sorted(os.listdir(directory)):
+        if name.endswith(".ndjson.gz"):
+            with gzip.open(os.path.join(directory, name)) as f:
+                ids.extend(json.loads(line)["id"] for line in f)
+    return ids
+
+
+# Test that rows inserted by the Lambda, which leave sent_at NULL, are archived by expires_at
+def test_archives_lambda_rows_without_sent_at(connection, sink):
+    insert_rows(connection, range(1, 4))
+    insert_rows(connection, range(4, 6), expires_at=datetime.utcnow())
+
+    assert archive_email_tracking(connection, sink, retention_days=30) == 3
+    assert archived_ids(sink) == [1, 2, 3]
+    assert remaining_ids(connection) == [4, 5]
+
+
+# Test that a run which crashed after uploading a chunk deletes exactly that chunk on resume
+def test_resumes_pending_deletion(connection, sink, monkeypatch):
+    insert_rows(connection, range(1, 11))
+
+    def crash(connection, ids, delete_batch_size):
+        raise RuntimeError("lost connection")
+
+    monkeypatch.setattr(archiver, "_delete_ids", crash)
+    with pytest.raises(RuntimeError):
+        archive_email_tracking(connection, sink, chunk_size=4)
+    monkeypatch.undo()
+
+    assert sink.read_json(CHECKPOINT_KEY)["pending"]["last_id"] == 4
+    assert remaining_ids(connection) == list(range(1, 11))
+
+    assert archive_email_tracking(connection, sink, chunk_size=4) == 6
+    assert archived_ids(sink) == list(range(1, 11))
+    assert remaining_ids(connection) == []
+    assert sink.read_json(CHECKPOINT_KEY) == {"last_id": 0}
+
+
+# Test that a run stops at its deadline and the next run continues from the checkpoint
+def test_stops_at_deadline_and_resumes(connection, sink, monkeypatch):
+    insert_rows(connection, range(1, 11))
+
+    class Clock:
+        # One chunk fits in the budget, then time is up.
+        ticks = iter([0, 100])
+
+        def monotonic(self):
+            return next(self.ticks)
+
+    monkeypatch.setattr(archiver, "time", Clock())
+    assert archive_email_tracking(connection, sink, chunk_size=4, deadline=50) == 4
+    monkeypatch.undo()
+
+    assert sink.read_json(CHECKPOINT_KEY) == {"last_id": 4}
+    assert remaining_ids(connection) == list(range(5, 11))
+
+    assert archive_email_tracking(connection, sink, chunk_size=4) == 6
+    assert archived_ids(sink) == list(range(1, 11))
+    assert remaining_ids(connection) == []
+
+
+# Test that rows appearing between the archive upload and the delete are left for the next run
+def test_deletes_only_archived_ids(connection, sink, monkeypatch):
+    insert_rows(connection, [1, 2, 4, 5])
+    put_file = sink.put_file
+
+    def put_file_then_insert(key, fileobj):
+        put_file(key, fileobj)
+        # A late-committed id inside the archived range, and a new row after it
+        insert_rows(connection, [3, 6])
+
+    monkeypatch.setattr(sink, "put_file", put_file_then_insert)
+    assert archive_email_tracking(connection, sink) == 4
+    monkeypatch.undo()
+
+    assert archived_ids(sink) == [1, 2, 4, 5]
+    assert remaining_ids(connection) == [3, 6]
+
+    assert archive_email_tracking(connection, sink) == 2
+    assert sorted(archived_ids(sink)) == [1, 2, 3, 4, 5, 6]
+    assert remaining_ids(connection) == []
@@ -227,3 +227,74 @@ resource "aws_iam_role_policy_attachment" "lambda_policy_attachment" {
   role       = aws_iam_role.lambda_execution_role.name
   policy_arn = aws_iam_policy.lambda_execution_policy.arn
 }
+
+# IAM Role for the Archival Lambda
+resource "aws_iam_role" "archival_lambda_role" {
+  name = "ArchivalLambdaExecutionRole"
+  assume_role_policy = jsonencode({
+    Version = "2012-10-17",
+    Statement = [
+      {
+        Effect = "Allow",
+        Principal = {
+          Service = "lambda.amazonaws.com"
+        },
+        Action = "sts:AssumeRole"
+      }
+    ]
+  })
+}
+
+# IAM Policy for the Archival Lambda Role
+resource "aws_iam_policy" "archival_lambda_policy" {
+  name = "ArchivalLambdaExecutionPolicy"
+  policy = jsonencode({
+    Version = "2012-10-17",
+    Statement = [
+      {
+        Effect = "Allow",
+        Action = [
+          "logs:CreateLogGroup",
+          "logs:CreateLogStream",
+          "logs:PutLogEvents"
+        ],
+        Resource = "arn:aws:logs:*:*:*"
+      },
+      {
+        Effect = "Allow",
+        Action = [
+          "kms:Decrypt"
+        ],
+        Resource = aws_kms_key.secrets_kms_key.arn
+      },
+      {
+        Effect = "Allow",
+        Action = [
+          "s3:PutObject",
+          "s3:GetObject"
+        ],
+        Resource = "${aws_s3_bucket.email_archive.arn}/*"
+      },
+      {
+        Effect = "Allow",
+        Action = [
+          "kms:Decrypt",
+          "kms:GenerateDataKey"
+        ],
+        Resource = aws_kms_key.s3_kms_key.arn
+      }
+    ]
+  })
+}
+
+# Attach Policies to the Archival Lambda Role
+resource "aws_iam_role_policy_attachment" "archival_lambda_policy_attachment" {
+  role       = aws_iam_role.archival_lambda_role.name
+  policy_arn = aws_iam_policy.archival_lambda_policy.arn
+}
+
+# Lets Lambda create the network interfaces it needs to run inside the VPC
+resource "aws_iam_role_policy_attachment" "archival_lambda_vpc_access" {
+  role       = aws_iam_role.archival_lambda_role.name
+  policy_arn = "arn:aws:iam::aws:policy/service-role/AWSLambdaVPCAccessExecutionRole"
+}
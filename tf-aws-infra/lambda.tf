@@ -33,3 +33,69 @@ resource "aws_lambda_permission" "allow_sns_invoke" {
   principal     = "sns.amazonaws.com"
   source_arn    = aws_sns_topic.user_created.arn
 }
+
+# KMS-encrypted RDS credentials for the archival Lambda (decrypted by connect_rds)
+resource "aws_kms_ciphertext" "archival_db_user" {
+  key_id    = aws_kms_key.secrets_kms_key.key_id
+  plaintext = aws_db_instance.db_instance.username
+}
+
+resource "aws_kms_ciphertext" "archival_db_password" {
+  key_id    = aws_kms_key.secrets_kms_key.key_id
+  plaintext = random_password.db_password.result
+}
+
+# Lambda Function for Email Tracking Archival
+resource "aws_lambda_function" "email_tracking_archival" {
+  function_name = var.archival_lambda_function_name
+  handler       = "archive_email_tracking.lambda_handler"
+  runtime       = var.lambda_runtime
+  role          = aws_iam_role.archival_lambda_role.arn
+  filename      = var.lambda_package_path
+
+  # The database only accepts connections from inside the VPC
+  vpc_config {
+    subnet_ids         = aws_subnet.private[*].id
+    security_group_ids = [aws_security_group.archival_lambda_sg.id]
+  }
+
+  environment {
+    variables = {
+      ARCHIVE_S3_BUCKET             = aws_s3_bucket.email_archive.id
+      EMAIL_TRACKING_RETENTION_DAYS = var.email_tracking_retention_days
+      DB_HOST                       = aws_db_instance.db_instance.address
+      DB_NAME                       = aws_db_instance.db_instance.db_name
+      DB_USER_ENCRYPTED             = aws_kms_ciphertext.archival_db_user.ciphertext_blob
+      DB_PASSWORD_ENCRYPTED         = aws_kms_ciphertext.archival_db_password.ciphertext_blob
+    }
+  }
+
+  timeout     = var.archival_lambda_timeout
+  memory_size = var.lambda_memory_size
+  description = "Lambda function to archive old email_tracking rows to S3."
+
+  tags = {
+    Environment = var.environment
+    Project     = var.project
+  }
+}
+
+# Scheduled Trigger for the Archival Lambda
+resource "aws_cloudwatch_event_rule" "email_tracking_archival_schedule" {
+  name                = "email-tracking-archival-schedule"
+  description         = "Archive and delete old email_tracking rows."
+  schedule_expression = var.archival_schedule_expression
+}
+
+resource "aws_cloudwatch_event_target" "email_tracking_archival_target" {
+  rule = aws_cloudwatch_event_rule.email_tracking_archival_schedule.name
+  arn  = aws_lambda_function.email_tracking_archival.arn
+}
+
+resource "aws_lambda_permission" "allow_eventbridge_invoke" {
+  statement_id  = "AllowEventBridgeToInvokeLambda"
+  action        = "lambda:InvokeFunction"
+  function_name = aws_lambda_function.email_tracking_archival.function_name
+  principal     = "events.amazonaws.com"
+  source_arn    = aws_cloudwatch_event_rule.email_tracking_archival_schedule.arn
+}
@@ -62,6 +62,20 @@ resource "aws_route_table_association" "public_association" {
   route_table_id = aws_route_table.public.id
 }
 
+# Private subnets have no internet route; AWS APIs are reached through VPC endpoints
+resource "aws_route_table" "private" {
+  vpc_id = aws_vpc.main.id
+  tags = {
+    Name = "private-route-table-${random_id.vpc.hex}-${time_static.current.id}-terraform"
+  }
+}
+
+resource "aws_route_table_association" "private_association" {
+  count          = length(var.availability_zones)
+  subnet_id      = aws_subnet.private[count.index].id
+  route_table_id = aws_route_table.private.id
+}
+
 # Security Groups
 resource "aws_security_group" "lb_sg" {
   vpc_id = aws_vpc.main.id
@@ -132,6 +146,13 @@ resource "aws_security_group" "db_sg" {
     security_groups = [aws_security_group.app_sg.id]
   }
 
+  ingress {
+    from_port       = 3306
+    to_port         = 3306
+    protocol        = "tcp"
+    security_groups = [aws_security_group.archival_lambda_sg.id]
+  }
+
   egress {
     from_port   = 0
     to_port     = 0
@@ -144,6 +165,62 @@ resource "aws_security_group" "db_sg" {
   }
 }
 
+resource "aws_security_group" "archival_lambda_sg" {
+  vpc_id = aws_vpc.main.id
+
+  egress {
+    from_port   = 0
+    to_port     = 0
+    protocol    = "-1"
+    cidr_blocks = ["0.0.0.0/0"]
+  }
+
+  tags = {
+    Name = "archival-lambda-sg-${random_id.vpc.hex}-${time_static.current.id}-terraform"
+  }
+}
+
+resource "aws_security_group" "vpc_endpoint_sg" {
+  vpc_id = aws_vpc.main.id
+
+  ingress {
+    from_port       = 443
+    to_port         = 443
+    protocol        = "tcp"
+    security_groups = [aws_security_group.archival_lambda_sg.id]
+  }
+
+  tags = {
+    Name = "vpc-endpoint-sg-${random_id.vpc.hex}-${time_static.current.id}-terraform"
+  }
+}
+
+# VPC Endpoints for the archival Lambda in the private subnets
+resource "aws_vpc_endpoint" "s3" {
+  vpc_id            = aws_vpc.main.id
+  service_name      = "com.amazonaws.${var.aws_region}.s3"
+  vpc_endpoint_type = "Gateway"
+  route_table_ids   = [aws_route_table.private.id]
+
+  tags = {
+    Name = "s3-endpoint-${random_id.vpc.hex}-${time_static.current.id}-terraform"
+  }
+}
+
+# connect_rds decrypts the database credentials with KMS
+resource "aws_vpc_endpoint" "kms" {
+  vpc_id              = aws_vpc.main.id
+  service_name        = "com.amazonaws.${var.aws_region}.kms"
+  vpc_endpoint_type   = "Interface"
+  subnet_ids          = aws_subnet.private[*].id
+  security_group_ids  = [aws_security_group.vpc_endpoint_sg.id]
+  private_dns_enabled = true
+
+  tags = {
+    Name = "kms-endpoint-${random_id.vpc.hex}-${time_static.current.id}-terraform"
+  }
+}
+
 # RDS Subnet Group
 resource "aws_db_subnet_group" "my_db_subnet_group" {
   name       = "my-db-subnet-group"
@@ -329,6 +406,8 @@ SNS_TOPIC_ARN="${aws_sns_topic.user_created.arn}"
 SENDGRID_API_KEY="$SENDGRID_API_KEY"
 FROM_EMAIL="$FROM_EMAIL"
 REPLY_TO_EMAIL="$REPLY_TO_EMAIL"
+TRUSTED_PROXY_COUNT=1
+RATE_LIMIT_BACKEND="database"
 EOF_ENV
 
 # Set ownership of the .env file
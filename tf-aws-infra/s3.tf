@@ -82,3 +82,26 @@ resource "aws_s3_bucket_policy" "image_storage_policy" {
     ]
   })
 }
+
+# S3 Bucket for Archived email_tracking Rows
+resource "aws_s3_bucket" "email_archive" {
+  bucket        = "email-tracking-archive-${random_id.s3_bucket.hex}"
+  force_destroy = true
+
+  tags = {
+    Name        = "email-tracking-archive-${random_id.s3_bucket.hex}"
+    Environment = var.environment
+    Project     = var.project
+  }
+}
+
+resource "aws_s3_bucket_server_side_encryption_configuration" "email_archive_encryption" {
+  bucket = aws_s3_bucket.email_archive.id
+
+  rule {
+    apply_server_side_encryption_by_default {
+      sse_algorithm     = "aws:kms"
+      kms_master_key_id = aws_kms_key.s3_kms_key.arn
+    }
+  }
+}
@@ -117,6 +117,26 @@ variable "lambda_memory_size" {
   default     = 256
 }
 
+variable "archival_lambda_function_name" {
+  description = "Lambda function name for email_tracking archival"
+  default     = "email-tracking-archival-function"
+}
+
+variable "archival_lambda_timeout" {
+  description = "Timeout for the archival Lambda function in seconds"
+  default     = 900
+}
+
+variable "archival_schedule_expression" {
+  description = "EventBridge schedule for the archival Lambda function"
+  default     = "rate(1 day)"
+}
+
+variable "email_tracking_retention_days" {
+  description = "Days to keep email_tracking rows in RDS before archiving them to S3"
+  default     = 30
+}
+
 # RDS Configuration
 variable "rds_host" {
   description = "RDS database host (optional override)"
@@ -0,0 +1,83 @@
+from flask import Blueprint, request, jsonify, Response, stream_with_context
+from datetime import datetime
+import logging
+
+from routes import auth, login_rate_limit, put_custom_metric
+from user_export import filtered_users, page_users, export_users
+
+logger = logging.getLogger("flask-app")
+
+# Blueprint for admin routes, restricted to the accounts listed in ADMIN_EMAILS
+admin_routes = Blueprint('admin_routes', __name__, url_prefix='/v1/admin')
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+EXPORT_MIMETYPES = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+}
+
+def parse_datetime(value, name):
+    if value is None:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"{name} must be an ISO 8601 timestamp")
+
+def parse_limit(value):
+    try:
+        limit = int(value)
+    except (TypeError, ValueError):
+        limit = None
+    if limit is None or not 1 <= limit <= MAX_PAGE_SIZE:
+        raise ValueError(f"limit must be between 1 and {MAX_PAGE_SIZE}")
+    return limit
+
+def parse_user_filters(args):
+    verified = args.get('verified')
+    if verified is not None:
+        if verified.lower() not in ('true', 'false'):
+            raise ValueError("verified must be true or false")
+        verified = verified.lower() == 'true'
+    return filtered_users(
+        verified=verified,
+        created_after=parse_datetime(args.get('created_after'), 'created_after'),
+        created_before=parse_datetime(args.get('created_before'), 'created_before'),
+    )
+
+# List Users Endpoint
+@admin_routes.route('/users', methods=['GET'])
+@login_rate_limit
+@auth.login_required(role='admin')
+def list_users():
+    try:
+        stmt = parse_user_filters(request.args)
+        limit = parse_limit(request.args.get('limit', DEFAULT_PAGE_SIZE))
+        users, next_cursor = page_users(stmt, limit, request.args.get('cursor'))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    put_custom_metric('AdminUserList', 1)
+    return jsonify({"users": users, "next_cursor": next_cursor}), 200
+
+# Export Users Endpoint
+@admin_routes.route('/users/export', methods=['GET'])
+@login_rate_limit
+@auth.login_required(role='admin')
+def export_users_route():
+    export_format = request.args.get('format', 'csv')
+    if export_format not in EXPORT_MIMETYPES:
+        return jsonify({"error": "format must be csv or ndjson"}), 400
+    try:
+        stmt = parse_user_filters(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    logger.info(f"User export ({export_format}) requested by {auth.current_user().email}")
+    put_custom_metric('AdminUserExport', 1)
+    return Response(
+        stream_with_context(export_users(stmt, export_format)),
+        mimetype=EXPORT_MIMETYPES[export_format],
+        headers={"Content-Disposition": f"attachment; filename=users.{export_format}"},
+    )
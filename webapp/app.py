@@ -1,7 +1,9 @@
 from flask import Flask
+from werkzeug.middleware.proxy_fix import ProxyFix
 from flask_bcrypt import Bcrypt
 from models import db
 from routes import user_routes
+from admin_routes import admin_routes
 from config import Config
 import logging
 from watchtower import CloudWatchLogHandler
@@ -20,10 +22,16 @@ bcrypt = Bcrypt(app)
 app.config.from_object(Config)
 
 
+# Trust X-Forwarded-For from the load balancer so rate limits see the client IP
+if Config.TRUSTED_PROXY_COUNT:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=Config.TRUSTED_PROXY_COUNT)
+
+
 db.init_app(app)
 
 
 app.register_blueprint(user_routes)
+app.register_blueprint(admin_routes)
 
 
 logger = logging.getLogger("flask-app")
@@ -0,0 +1,92 @@
+"""
+Benchmark the admin user export against a local SQLite database.
+
+    python benchmark_admin_export.py --users 1000000 --format csv
+"""
+import argparse
+import multiprocessing
+import os
+import resource
+import sqlite3
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from flask import Flask
+
+from models import db
+from user_export import export_users, filtered_users
+
+
+def build_fixture(path, users):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{path}"
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+
+    connection = sqlite3.connect(path)
+    start = datetime(2024, 1, 1)
+    batch = []
+    for i in range(users):
+        created = (start + timedelta(seconds=i * 30)).strftime("%Y-%m-%d %H:%M:%S.%f")
+        batch.append((f"user{i}@example.com", "x" * 60, "Test", "User", i % 3 == 0, created, created))
+        if len(batch) == 100000:
+            connection.executemany(
+                "INSERT INTO user (email, password, first_name, last_name, verified, account_created, "
+                "account_updated) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                batch
+            )
+            batch = []
+    if batch:
+        connection.executemany(
+            "INSERT INTO user (email, password, first_name, last_name, verified, account_created, "
+            "account_updated) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            batch
+        )
+    connection.commit()
+    connection.close()
+
+
+def peak_rss_mib():
+    # ru_maxrss is reported in KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, default=1000000)
+    parser.add_argument("--format", choices=["csv", "ndjson"], default="csv")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        path = os.path.join(workdir, "bench.db")
+        print(f"Building fixture with {args.users} users...")
+        # Build in a child process so the fixture does not count towards peak RSS.
+        builder = multiprocessing.Process(target=build_fixture, args=(path, args.users))
+        builder.start()
+        builder.join()
+
+        app = Flask(__name__)
+        app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{path}"
+        db.init_app(app)
+        with app.app_context():
+            rss_before = peak_rss_mib()
+            start = time.perf_counter()
+            exported_bytes = 0
+            lines = 0
+            for chunk in export_users(filtered_users(), args.format):
+                exported_bytes += len(chunk)
+                lines += chunk.count("\n")
+            elapsed = time.perf_counter() - start
+            rss_after = peak_rss_mib()
+
+    rows = lines - 1 if args.format == "csv" else lines
+    assert rows == args.users, f"expected {args.users} rows, got {rows}"
+    print(f"Exported {rows} users as {args.format} in {elapsed:.2f}s ({rows / elapsed:,.0f} rows/s), "
+          f"{exported_bytes / 1024 / 1024:.1f} MiB")
+    print(f"Peak RSS {rss_after:.1f} MiB (before export {rss_before:.1f} MiB)")
+
+
+if __name__ == '__main__':
+    main()
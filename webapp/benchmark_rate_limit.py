@@ -0,0 +1,74 @@
+"""
+Benchmark rate limiter overhead and the CPU it saves under a credential-stuffing replay.
+
+    python benchmark_rate_limit.py --requests 100
+"""
+import argparse
+import base64
+import os
+import time
+
+# routes creates its AWS clients at import time
+os.environ.setdefault("AWS_REGION", "us-east-1")
+
+from flask import Flask
+
+from models import db, User
+from rate_limit import DatabaseBackend, RateLimit, RateLimiter
+import routes
+
+
+def check_overhead(limiter, calls):
+    limit = RateLimit('bench', calls * 2, 60, None)
+    start = time.perf_counter()
+    for i in range(calls):
+        limiter.check(limit, f"10.0.{i % 250}.{i % 7}")
+    return (time.perf_counter() - start) / calls * 1e6
+
+
+def replay_attack(app, requests, enabled):
+    routes.rate_limiter.enabled = enabled
+    routes.rate_limiter.reset()
+    client = app.test_client()
+    credentials = base64.b64encode(b"victim@example.com:guess").decode()
+    headers = {"Authorization": f"Basic {credentials}"}
+
+    start = time.process_time()
+    statuses = {}
+    for _ in range(requests):
+        status = client.get('/v1/user/self', headers=headers).status_code
+        statuses[status] = statuses.get(status, 0) + 1
+    return time.process_time() - start, statuses
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--calls", type=int, default=20000)
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    db.init_app(app)
+    app.register_blueprint(routes.user_routes)
+
+    with app.app_context():
+        db.create_all()
+        victim = User(email="victim@example.com", first_name="Victim", last_name="User", verified=True)
+        victim.set_password("correct horse battery staple")
+        db.session.add(victim)
+        db.session.commit()
+
+        shared = RateLimiter(DatabaseBackend(app.config['SQLALCHEMY_DATABASE_URI']))
+        print(f"In-process check:      {check_overhead(RateLimiter(), args.calls):8.1f} us/request")
+        print(f"DatabaseBackend check: {check_overhead(shared, args.calls // 10):8.1f} us/request (SQLite)")
+
+        for enabled in (False, True):
+            cpu, statuses = replay_attack(app, args.requests, enabled)
+            label = "limiter on " if enabled else "limiter off"
+            print(f"Attack replay, {label}: {cpu:6.2f}s CPU for {args.requests} requests "
+                  f"({cpu / args.requests * 1000:.2f} ms/request), statuses {statuses}")
+
+
+if __name__ == '__main__':
+    main()
@@ -13,3 +13,16 @@ class Config:
     SENDGRID_API_KEY = os.getenv('SENDGRID_API_KEY')
     FROM_EMAIL = os.getenv('FROM_EMAIL')
     REPLY_TO_EMAIL = os.getenv('REPLY_TO_EMAIL')
+    ADMIN_EMAILS = [email.strip() for email in os.getenv('ADMIN_EMAILS', '').split(',') if email.strip()]
+    IDEMPOTENCY_TTL_SECONDS = int(os.getenv('IDEMPOTENCY_TTL_SECONDS', 86400))
+    IDEMPOTENCY_CACHE_SIZE = int(os.getenv('IDEMPOTENCY_CACHE_SIZE', 1024))
+    IDEMPOTENCY_WAIT_SECONDS = float(os.getenv('IDEMPOTENCY_WAIT_SECONDS', 30))
+    IDEMPOTENCY_LEASE_SECONDS = float(os.getenv('IDEMPOTENCY_LEASE_SECONDS', 60))
+    TRUSTED_PROXY_COUNT = int(os.getenv('TRUSTED_PROXY_COUNT', 0))
+    RATE_LIMIT_ENABLED = os.getenv('RATE_LIMIT_ENABLED', 'true').lower() == 'true'
+    RATE_LIMIT_BACKEND = os.getenv('RATE_LIMIT_BACKEND', 'memory')
+    RATE_LIMIT_LOGIN_PER_IP = int(os.getenv('RATE_LIMIT_LOGIN_PER_IP', 300))
+    RATE_LIMIT_LOGIN_FAILURES_PER_IP = int(os.getenv('RATE_LIMIT_LOGIN_FAILURES_PER_IP', 30))
+    RATE_LIMIT_LOGIN_FAILURES_PER_EMAIL = int(os.getenv('RATE_LIMIT_LOGIN_FAILURES_PER_EMAIL', 100))
+    RATE_LIMIT_SIGNUP_PER_IP = int(os.getenv('RATE_LIMIT_SIGNUP_PER_IP', 20))
+    RATE_LIMIT_SIGNUP_PER_EMAIL = int(os.getenv('RATE_LIMIT_SIGNUP_PER_EMAIL', 10))
@@ -1,6 +1,7 @@
 import pytest
 from app import app as flask_app
 from models import db
+from routes import rate_limiter
 
 @pytest.fixture
 def app():
@@ -12,6 +13,7 @@ def app():
     
     with flask_app.app_context():
         db.create_all()  
+        rate_limiter.reset()
         yield flask_app 
         db.session.remove()
         db.drop_all()
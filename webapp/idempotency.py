@@ -0,0 +1,301 @@
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from datetime import datetime, timedelta
+from functools import wraps
+
+from flask import request, jsonify, make_response
+from sqlalchemy.exc import IntegrityError
+
+from models import db, IdempotencyKey
+
+logger = logging.getLogger("flask-app")
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+MAX_KEY_LENGTH = 255
+FORM_MIMETYPES = ("multipart/form-data", "application/x-www-form-urlencoded")
+
+CachedResponse = namedtuple("CachedResponse", "fingerprint status_code body mimetype expires_at")
+
+
+class IdempotencyInProgress(Exception):
+    """Raised when a duplicate request gives up waiting on the in-flight one."""
+
+
+class IdempotencyStore:
+    """
+    Two-level store of finished responses keyed by Idempotency-Key.
+    An in-process LRU answers repeats on this instance; the idempotency_key
+    table lets instances behind the load balancer see each other's requests.
+    """
+
+    def __init__(self, ttl_seconds, max_entries, wait_seconds, lease_seconds, poll_interval=0.25,
+                 purge_interval=60, purge_batch_size=1000):
+        self.ttl = timedelta(seconds=ttl_seconds)
+        self.lease = timedelta(seconds=lease_seconds)
+        self.max_entries = max_entries
+        self.wait_seconds = wait_seconds
+        self.poll_interval = poll_interval
+        self.purge_interval = purge_interval
+        self.purge_batch_size = purge_batch_size
+        self._next_purge = 0
+        self._cache = OrderedDict()
+        self._in_flight = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, key, fingerprint):
+        """
+        Return the CachedResponse to replay for key, or None once the caller
+        owns the key and must execute the request and call complete/release.
+        """
+        deadline = time.monotonic() + self.wait_seconds
+        while True:
+            with self._lock:
+                cached = self._get_cached(key)
+                waiting_on = None if cached else self._in_flight.get(key)
+                if cached is None and waiting_on is None:
+                    self._in_flight[key] = threading.Event()
+            if cached is not None:
+                return cached
+            if waiting_on is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not waiting_on.wait(remaining):
+                    raise IdempotencyInProgress()
+                continue
+
+            try:
+                cached = self._claim(key, fingerprint, deadline)
+            except Exception:
+                self._finish(key)
+                raise
+            if cached is not None:
+                self._finish(key, cached)
+            return cached
+
+    def complete(self, key, fingerprint, response):
+        """Persist the owner's final response and wake any waiting duplicates."""
+        cached = CachedResponse(
+            fingerprint,
+            response.status_code,
+            response.get_data(),
+            response.mimetype,
+            datetime.utcnow() + self.ttl,
+        )
+        try:
+            record = db.session.get(IdempotencyKey, key)
+            if record is None:
+                record = IdempotencyKey(key=key, fingerprint=fingerprint)
+                db.session.add(record)
+            record.status_code = cached.status_code
+            record.response_body = cached.body
+            record.mimetype = cached.mimetype
+            record.expires_at = cached.expires_at
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Failed to persist idempotent response: {e}")
+        finally:
+            self._finish(key, cached)
+
+    def release(self, key):
+        """Drop an unfinished claim so a retry can execute the request again."""
+        try:
+            db.session.rollback()
+            IdempotencyKey.query.filter_by(key=key, status_code=None).delete()
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Failed to release idempotency key: {e}")
+        finally:
+            self._finish(key)
+
+    def cached(self, key):
+        """Return the response cached in process for key, without touching the database."""
+        with self._lock:
+            return self._get_cached(key)
+
+    def purge_expired(self):
+        """Delete expired rows in small batches, at most once per purge_interval."""
+        if time.monotonic() < self._next_purge:
+            return
+        self._next_purge = time.monotonic() + self.purge_interval
+        now = datetime.utcnow()
+        try:
+            while True:
+                keys = [
+                    key for key, in db.session.query(IdempotencyKey.key)
+                    .filter(IdempotencyKey.expires_at < now)
+                    .limit(self.purge_batch_size)
+                ]
+                if not keys:
+                    break
+                IdempotencyKey.query.filter(
+                    IdempotencyKey.key.in_(keys), IdempotencyKey.expires_at < now
+                ).delete(synchronize_session=False)
+                db.session.commit()
+                if len(keys) < self.purge_batch_size:
+                    break
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Failed to purge expired idempotency keys: {e}")
+
+    def _claim(self, key, fingerprint, deadline):
+        self.purge_expired()
+        while True:
+            now = datetime.utcnow()
+            record = db.session.get(IdempotencyKey, key)
+            if record is not None and record.expires_at <= now:
+                # Either the stored response expired or the owner's lease ran out
+                # (it crashed or was scaled in); only delete if nobody renewed it.
+                db.session.expunge(record)
+                IdempotencyKey.query.filter(
+                    IdempotencyKey.key == key, IdempotencyKey.expires_at <= now
+                ).delete(synchronize_session=False)
+                db.session.commit()
+                record = None
+
+            if record is None:
+                # Claim with a short lease; complete() extends it to the response TTL.
+                db.session.add(IdempotencyKey(key=key, fingerprint=fingerprint, expires_at=now + self.lease))
+                try:
+                    db.session.commit()
+                    return None
+                except IntegrityError:
+                    # Another instance claimed the key first.
+                    db.session.rollback()
+                    continue
+
+            if record.status_code is not None:
+                return CachedResponse(
+                    record.fingerprint,
+                    record.status_code,
+                    record.response_body,
+                    record.mimetype,
+                    record.expires_at,
+                )
+
+            # Another instance is executing this request; poll for its result
+            # until it finishes or its lease expires.
+            db.session.rollback()
+            if time.monotonic() >= deadline:
+                raise IdempotencyInProgress()
+            time.sleep(self.poll_interval)
+
+    def _get_cached(self, key):
+        cached = self._cache.get(key)
+        if cached is None:
+            return None
+        if cached.expires_at <= datetime.utcnow():
+            del self._cache[key]
+            return None
+        self._cache.move_to_end(key)
+        return cached
+
+    def _finish(self, key, cached=None):
+        with self._lock:
+            if cached is not None:
+                self._cache[key] = cached
+                self._cache.move_to_end(key)
+                while len(self._cache) > self.max_entries:
+                    self._cache.popitem(last=False)
+            event = self._in_flight.pop(key, None)
+        if event is not None:
+            event.set()
+
+
+def _storage_key(idempotency_key, scope):
+    raw = f"{scope}:{request.method}:{request.path}:{idempotency_key}"
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def _fingerprint():
+    """
+    Hash what the request says rather than how it was encoded: a rebuilt
+    multipart upload gets a new boundary, so form requests are hashed from
+    their parsed fields and file contents instead of the raw body.
+    """
+    digest = hashlib.sha256()
+    if request.mimetype not in FORM_MIMETYPES:
+        digest.update(request.get_data())
+        return digest.hexdigest()
+
+    for name, value in sorted(request.form.items(multi=True)):
+        digest.update(json.dumps(["field", name, value]).encode())
+    files = sorted(request.files.items(multi=True), key=lambda item: (item[0], item[1].filename or ""))
+    for name, storage in files:
+        content = hashlib.sha256()
+        for block in iter(lambda: storage.stream.read(64 * 1024), b""):
+            content.update(block)
+        storage.stream.seek(0)
+        digest.update(json.dumps(["file", name, storage.filename, content.hexdigest()]).encode())
+    return digest.hexdigest()
+
+
+def has_cached_response(store, scope=None):
+    """
+    Return whether this request is a retry that idempotent(store, scope) will
+    replay from the in-process cache, so callers can skip work it makes
+    unnecessary. Replays stored by another instance are not seen here.
+    """
+    idempotency_key = request.headers.get(IDEMPOTENCY_HEADER)
+    if not idempotency_key or len(idempotency_key) > MAX_KEY_LENGTH:
+        return False
+    cached = store.cached(_storage_key(idempotency_key, scope() if scope else None))
+    return cached is not None and cached.fingerprint == _fingerprint()
+
+
+def _replay(cached):
+    response = make_response(cached.body, cached.status_code)
+    response.mimetype = cached.mimetype
+    response.headers[REPLAYED_HEADER] = "true"
+    return response
+
+
+def idempotent(store, scope=None, metric=None):
+    """
+    Replay the stored response for repeated requests carrying the same
+    Idempotency-Key. Requests without the header run as usual; 5xx responses
+    are not stored so the client can retry them.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            idempotency_key = request.headers.get(IDEMPOTENCY_HEADER)
+            if not idempotency_key:
+                return view(*args, **kwargs)
+            if len(idempotency_key) > MAX_KEY_LENGTH:
+                return jsonify({"error": f"{IDEMPOTENCY_HEADER} must be at most {MAX_KEY_LENGTH} characters"}), 400
+
+            key = _storage_key(idempotency_key, scope() if scope else None)
+            fingerprint = _fingerprint()
+            try:
+                cached = store.acquire(key, fingerprint)
+            except IdempotencyInProgress:
+                return jsonify({"error": f"A request with this {IDEMPOTENCY_HEADER} is still in progress"}), 409
+
+            if cached is not None:
+                if cached.fingerprint != fingerprint:
+                    if metric:
+                        metric('IdempotencyKeyMismatch', 1)
+                    return jsonify({"error": f"{IDEMPOTENCY_HEADER} was already used with a different request"}), 422
+                if metric:
+                    metric('IdempotentReplay', 1)
+                logger.info(f"Replaying stored response for {request.method} {request.path}")
+                return _replay(cached)
+
+            try:
+                response = make_response(view(*args, **kwargs))
+            except Exception:
+                store.release(key)
+                raise
+            if response.status_code >= 500:
+                store.release(key)
+            else:
+                store.complete(key, fingerprint, response)
+            return response
+        return wrapper
+    return decorator
@@ -14,7 +14,12 @@ class User(db.Model):
     verified = db.Column(db.Boolean, default=False)
     account_created = db.Column(db.DateTime, default=datetime.utcnow)
     account_updated = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
-    
+
+    # Keyset pagination and exports for the admin API seek on (account_created, id)
+    __table_args__ = (
+        db.Index('ix_user_account_created_id', 'account_created', 'id'),
+        db.Index('ix_user_verified_account_created_id', 'verified', 'account_created', 'id'),
+    )
 
     def set_password(self, password):
         self.password = bcrypt.generate_password_hash(password).decode('utf-8')
@@ -34,9 +39,27 @@ class EmailTracking(db.Model):
         default='pending',
         nullable=False
     )
-    sent_at = db.Column(db.DateTime, default=datetime.utcnow)
+    sent_at = db.Column(db.DateTime, default=datetime.utcnow, server_default=db.func.now())
 
     # Define relationship with User table
     user = db.relationship('User', backref=db.backref('email_tracking', cascade='all, delete-orphan'))
 
 
+class IdempotencyKey(db.Model):
+    key = db.Column(db.String(64), primary_key=True)
+    fingerprint = db.Column(db.String(64), nullable=False)
+    # NULL until the owning request finishes; a row without a status is in flight
+    # and expires_at is the end of its owner's lease rather than the response TTL.
+    status_code = db.Column(db.Integer)
+    response_body = db.Column(db.LargeBinary)
+    mimetype = db.Column(db.String(120))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+
+
+class RateLimitCounter(db.Model):
+    key = db.Column(db.String(64), primary_key=True)
+    window_index = db.Column(db.BigInteger, primary_key=True, autoincrement=False)
+    count = db.Column(db.Integer, nullable=False, default=0)
+    # Epoch seconds after which the counter no longer affects any decision
+    expires_at = db.Column(db.BigInteger, nullable=False, index=True)
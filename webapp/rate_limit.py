@@ -0,0 +1,302 @@
+import hashlib
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from functools import wraps
+
+from flask import request, jsonify, make_response
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.engine import make_url
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from models import db, RateLimitCounter
+
+logger = logging.getLogger("flask-app")
+
+# limit requests per window_seconds for each value returned by key_func; a
+# failures_only limit keeps just the requests that fail authentication, and a
+# limit that is not shared is enforced by each instance on its own
+RateLimit = namedtuple(
+    "RateLimit", "name limit window_seconds key_func failures_only shared", defaults=(False, True)
+)
+
+
+class MemoryBackend:
+    """Per-process window counters, bounded to max_keys most recently seen keys."""
+
+    def __init__(self, max_keys=100000):
+        self.max_keys = max_keys
+        self._counters = OrderedDict()
+        self._lock = threading.Lock()
+
+    def hit(self, key, window_index, window_seconds):
+        with self._lock:
+            current, previous = self._counts(key, window_index)
+            current += 1
+            self._store(key, window_index, current, previous)
+        return current, previous
+
+    def merge(self, key, window_index, current, previous):
+        """Raise the counts for key to at least those read from a shared backend."""
+        with self._lock:
+            local_current, local_previous = self._counts(key, window_index)
+            self._store(key, window_index, max(current, local_current), max(previous, local_previous))
+
+    def release(self, key, window_index):
+        with self._lock:
+            if key not in self._counters:
+                return
+            stored_window, current, previous = self._counters[key]
+            if stored_window == window_index and current > 0:
+                self._counters[key] = (stored_window, current - 1, previous)
+            elif stored_window == window_index + 1 and previous > 0:
+                self._counters[key] = (stored_window, current, previous - 1)
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+
+    def _counts(self, key, window_index):
+        stored_window, current, previous = self._counters.get(key, (window_index, 0, 0))
+        if stored_window == window_index - 1:
+            return 0, current
+        if stored_window != window_index:
+            return 0, 0
+        return current, previous
+
+    def _store(self, key, window_index, current, previous):
+        self._counters[key] = (window_index, current, previous)
+        self._counters.move_to_end(key)
+        while len(self._counters) > self.max_keys:
+            self._counters.popitem(last=False)
+
+
+class DatabaseBackend:
+    """Window counters in the rate_limit_counter table, shared by every instance."""
+
+    # A single upsert: UPDATE-then-INSERT deadlocks on gap locks in MySQL when
+    # two requests create the same window's counter at once.
+    UPSERTS = {
+        'mysql': lambda table, values: mysql_insert(table).values(**values).on_duplicate_key_update(
+            count=table.c.count + 1
+        ),
+        'sqlite': lambda table, values: sqlite_insert(table).values(**values).on_conflict_do_update(
+            index_elements=[table.c.key, table.c.window_index],
+            set_={"count": table.c.count + 1},
+        ),
+    }
+
+    def __init__(self, database_uri, purge_interval=60):
+        dialect = make_url(database_uri).get_backend_name()
+        if dialect not in self.UPSERTS:
+            raise ValueError(f"DatabaseBackend does not support {dialect} databases")
+        self._upsert = self.UPSERTS[dialect]
+        self.purge_interval = purge_interval
+        self._next_purge = 0
+
+    def hit(self, key, window_index, window_seconds):
+        window_start = window_index * window_seconds
+        try:
+            db.session.execute(self._increment(key, window_index, int(window_start + 2 * window_seconds)))
+            counts = self._counts(key, window_index)
+            if time.monotonic() >= self._next_purge:
+                self._next_purge = time.monotonic() + self.purge_interval
+                RateLimitCounter.query.filter(RateLimitCounter.expires_at < window_start).delete(
+                    synchronize_session=False
+                )
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        return counts.get(window_index, 0), counts.get(window_index - 1, 0)
+
+    def _increment(self, key, window_index, expires_at):
+        values = dict(key=key, window_index=window_index, count=1, expires_at=expires_at)
+        return self._upsert(RateLimitCounter.__table__, values)
+
+    def _counts(self, key, window_index):
+        return dict(
+            db.session.query(RateLimitCounter.window_index, RateLimitCounter.count)
+            .filter(RateLimitCounter.key == key)
+            .filter(RateLimitCounter.window_index.in_([window_index, window_index - 1]))
+            .all()
+        )
+
+    def reset(self):
+        RateLimitCounter.query.delete()
+        db.session.commit()
+
+
+class RateLimiter:
+    """
+    Sliding-window limiter: the previous window's count is weighted by how much
+    of it still overlaps the last window_seconds, which smooths the burst a
+    fixed window would allow at every window boundary.
+
+    Every request is counted in process first, so requests already over a
+    limit here are rejected without touching the shared backend. Limits that
+    are not shared never reach it, and failures_only limits only write the
+    failures to it, so valid logins cost no shared-backend round trip.
+    """
+
+    def __init__(self, shared=None, enabled=True):
+        self.local = MemoryBackend()
+        self.shared = shared
+        self.enabled = enabled
+
+    def check(self, limit, value, now=None):
+        """Count one request for value and return (allowed, remaining, reset_seconds)."""
+        now = time.time() if now is None else now
+        key, window_index = self._key(limit, value), int(now // limit.window_seconds)
+        result = self._estimate(limit, now, *self.local.hit(key, window_index, limit.window_seconds))
+        if not result[0] or self.shared is None or not limit.shared or limit.failures_only:
+            return result
+        try:
+            counts = self.shared.hit(key, window_index, limit.window_seconds)
+        except Exception as e:
+            logger.error(f"Shared rate limit {limit.name} unavailable, using this instance's count: {e}")
+            return result
+        return self._estimate(limit, now, *counts)
+
+    def record_failure(self, limit, value, now):
+        """
+        Add a failed request, already counted by check, to the shared backend and
+        return the updated result, or None when the limit is kept in process only.
+        """
+        if self.shared is None or not limit.shared:
+            return None
+        key, window_index = self._key(limit, value), int(now // limit.window_seconds)
+        counts = self.shared.hit(key, window_index, limit.window_seconds)
+        # Other instances' failures now count against this one's reservations too.
+        self.local.merge(key, window_index, *counts)
+        return self._estimate(limit, now, *counts)
+
+    def release(self, limit, value, now):
+        """Give back the request counted by check(limit, value, now)."""
+        self.local.release(self._key(limit, value), int(now // limit.window_seconds))
+
+    def reset(self):
+        self.local.reset()
+        if self.shared is not None:
+            self.shared.reset()
+
+    def _key(self, limit, value):
+        return hashlib.sha256(f"{limit.name}:{value}".encode()).hexdigest()
+
+    def _estimate(self, limit, now, current, previous):
+        window_seconds = limit.window_seconds
+        elapsed = now - int(now // window_seconds) * window_seconds
+        estimated = previous * (window_seconds - elapsed) / window_seconds + current
+        remaining = max(0, math.floor(limit.limit - estimated))
+        reset = max(1, math.ceil(window_seconds - elapsed))
+        return estimated <= limit.limit, remaining, reset
+
+
+def client_ip():
+    # remote_addr is the client address once ProxyFix has applied X-Forwarded-For
+    return request.remote_addr
+
+
+def basic_auth_email():
+    authorization = request.authorization
+    if authorization and authorization.username:
+        return authorization.username.strip().lower()
+    return None
+
+
+def json_email():
+    data = request.get_json(silent=True)
+    if isinstance(data, dict) and isinstance(data.get('email'), str):
+        return data['email'].strip().lower()
+    return None
+
+
+def _set_headers(response, limit, remaining, reset):
+    response.headers['RateLimit-Limit'] = str(limit.limit)
+    response.headers['RateLimit-Remaining'] = str(remaining)
+    response.headers['RateLimit-Reset'] = str(reset)
+    response.headers['RateLimit-Policy'] = f"{limit.limit};w={limit.window_seconds}"
+
+
+def _check_limits(limiter, keyed, now):
+    results = []
+    for limit, value in keyed:
+        try:
+            results.append((limit, value) + limiter.check(limit, value, now))
+        except Exception as e:
+            # Fail open: an unavailable limiter must not take the API down with it.
+            logger.error(f"Rate limit {limit.name} unavailable, allowing request: {e}")
+    return results
+
+
+def _release_limits(limiter, results, now):
+    for limit, value, *_ in results:
+        try:
+            limiter.release(limit, value, now)
+        except Exception as e:
+            logger.error(f"Rate limit {limit.name} unavailable, could not release request: {e}")
+
+
+def _record_failures(limiter, results, now):
+    recorded = []
+    for limit, value, *result in results:
+        try:
+            shared_result = limiter.record_failure(limit, value, now)
+        except Exception as e:
+            logger.error(f"Shared rate limit {limit.name} unavailable, failure counted by this instance only: {e}")
+            shared_result = None
+        recorded.append((limit, value) + tuple(shared_result or result))
+    return recorded
+
+
+def rate_limited(limiter, *limits, metric=None, failure_status=401, exempt=None):
+    """
+    Reject requests over any of limits with 429 before the view runs.
+    Place above auth.login_required so rejected requests never reach the
+    user lookup or bcrypt check. failures_only limits reserve their slot up
+    front, so concurrent requests cannot all pass before any is counted, and
+    give it back unless the view answers with failure_status.
+    Requests for which exempt() returns True skip the limits entirely.
+    If the backend fails the request is let through rather than failed.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if not limiter.enabled or (exempt and exempt()):
+                return view(*args, **kwargs)
+
+            now = time.time()
+            keyed = [(limit, limit.key_func()) for limit in limits]
+            results = _check_limits(limiter, [(limit, value) for limit, value in keyed if value is not None], now)
+            reserved = [result for result in results if result[0].failures_only]
+
+            blocked = [result for result in results if not result[2]]
+            if blocked:
+                # A rejected request is not a failed login.
+                _release_limits(limiter, reserved, now)
+                limit, _, _, remaining, reset = max(blocked, key=lambda result: result[4])
+                if metric:
+                    metric('RateLimited', 1)
+                response = make_response(jsonify({"error": "Too many requests. Try again later."}), 429)
+                response.headers['Retry-After'] = str(reset)
+            else:
+                try:
+                    response = make_response(view(*args, **kwargs))
+                except Exception:
+                    _release_limits(limiter, reserved, now)
+                    raise
+                results = [result for result in results if not result[0].failures_only]
+                if response.status_code == failure_status:
+                    results += _record_failures(limiter, reserved, now)
+                else:
+                    _release_limits(limiter, reserved, now)
+                if not results:
+                    return response
+                limit, _, _, remaining, reset = min(results, key=lambda result: result[3])
+
+            _set_headers(response, limit, remaining, reset)
+            return response
+        return wrapper
+    return decorator
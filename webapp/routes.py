@@ -13,6 +13,11 @@ from sendgrid import SendGridAPIClient
 from sendgrid.helpers.mail import Mail, Email, To, Content
 from datetime import datetime, timedelta
 import hashlib
+from idempotency import IdempotencyStore, idempotent, has_cached_response
+from rate_limit import (
+    RateLimit, RateLimiter, DatabaseBackend,
+    rate_limited, client_ip, basic_auth_email, json_email,
+)
 
 # Initialize clients and configurations
 statsd_client = statsd.StatsClient('localhost', 8125)
@@ -30,6 +35,39 @@ user_routes = Blueprint('user_routes', __name__, url_prefix='/v1')
 bcrypt = Bcrypt()
 auth = HTTPBasicAuth()
 
+# Responses replayed for retried requests carrying an Idempotency-Key
+idempotency_store = IdempotencyStore(
+    ttl_seconds=Config.IDEMPOTENCY_TTL_SECONDS,
+    max_entries=Config.IDEMPOTENCY_CACHE_SIZE,
+    wait_seconds=Config.IDEMPOTENCY_WAIT_SECONDS,
+    lease_seconds=Config.IDEMPOTENCY_LEASE_SECONDS,
+)
+
+# Rate limits checked before the user lookup and bcrypt work
+rate_limiter = RateLimiter(
+    DatabaseBackend(Config.SQLALCHEMY_DATABASE_URI) if Config.RATE_LIMIT_BACKEND == 'database' else None,
+    enabled=Config.RATE_LIMIT_ENABLED,
+)
+login_rate_limit = rate_limited(
+    rate_limiter,
+    # Caps the bcrypt work each instance does for one client, so it is kept per instance.
+    RateLimit('login-ip', Config.RATE_LIMIT_LOGIN_PER_IP, 60, client_ip, shared=False),
+    # Only failed logins count, so valid traffic is never throttled per account and
+    # one client cannot lock a victim out; the email limit catches distributed guessing.
+    RateLimit('login-failures-ip', Config.RATE_LIMIT_LOGIN_FAILURES_PER_IP, 60, client_ip, failures_only=True),
+    RateLimit('login-failures-email', Config.RATE_LIMIT_LOGIN_FAILURES_PER_EMAIL, 60, basic_auth_email,
+              failures_only=True),
+    metric=statsd_client.incr,
+)
+signup_rate_limit = rate_limited(
+    rate_limiter,
+    RateLimit('signup-ip', Config.RATE_LIMIT_SIGNUP_PER_IP, 60, client_ip),
+    RateLimit('signup-email', Config.RATE_LIMIT_SIGNUP_PER_EMAIL, 60, json_email),
+    metric=statsd_client.incr,
+    # A retry this instance can replay from memory costs nothing, so it does not use up the limits.
+    exempt=lambda: has_cached_response(idempotency_store),
+)
+
 @auth.verify_password
 def verify_password(email, password):
     user = User.query.filter_by(email=email).first()
@@ -41,6 +79,10 @@ def verify_password(email, password):
             return None
     return None
 
+@auth.get_user_roles
+def get_user_roles(user):
+    return ['admin'] if user.email in Config.ADMIN_EMAILS else []
+
 # Helper methods
 def put_custom_metric(metric_name, value):
     cloudwatch_client.put_metric_data(
@@ -118,11 +160,17 @@ def is_user_verified(user):
     """Check if the user is verified."""
 
     return user.verified
+
+def current_user_id():
+    return auth.current_user().id
+
     
     
 
 # Create User Endpoint
 @user_routes.route('/user', methods=['POST'])
+@signup_rate_limit
+@idempotent(idempotency_store, metric=put_custom_metric)
 def create_user():
     try:
         data = request.json
@@ -233,6 +281,7 @@ def verify_user():
 
 # Get User Details Endpoint
 @user_routes.route('/user/self', methods=['GET'])
+@login_rate_limit
 @auth.login_required
 def get_user():
     try:
@@ -254,7 +303,9 @@ def get_user():
         return jsonify({"error": "Internal server error"}), 500
 
 @user_routes.route('/user/self/pic', methods=['POST'])
+@login_rate_limit
 @auth.login_required
+@idempotent(idempotency_store, scope=current_user_id, metric=put_custom_metric)
 def upload_image():
     """
     Upload an image for the user.
@@ -300,6 +351,7 @@ def upload_image():
 
 
 @user_routes.route('/user/self/pic', methods=['DELETE'])
+@login_rate_limit
 @auth.login_required
 def delete_image():
     """
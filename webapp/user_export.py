@@ -0,0 +1,110 @@
+import base64
+import csv
+import io
+import json
+from datetime import datetime
+
+from sqlalchemy import and_, or_, select
+
+from models import User, db
+
+EXPORT_COLUMNS = (
+    User.id,
+    User.email,
+    User.first_name,
+    User.last_name,
+    User.verified,
+    User.account_created,
+    User.account_updated,
+)
+EXPORT_FIELDS = [column.key for column in EXPORT_COLUMNS]
+
+
+def filtered_users(verified=None, created_after=None, created_before=None):
+    """Select user columns in (account_created, id) order, the order of the composite indexes."""
+    stmt = select(*EXPORT_COLUMNS)
+    if verified is not None:
+        stmt = stmt.where(User.verified == verified)
+    if created_after is not None:
+        stmt = stmt.where(User.account_created >= created_after)
+    if created_before is not None:
+        stmt = stmt.where(User.account_created < created_before)
+    return stmt.order_by(User.account_created, User.id)
+
+
+def encode_cursor(account_created, user_id):
+    raw = f"{account_created.isoformat()}|{user_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        account_created, user_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(account_created), int(user_id)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+def page_users(stmt, limit, cursor=None):
+    """
+    Return one page of users after cursor and the cursor for the next page.
+    Seeks on (account_created, id) so every page costs the same regardless of depth.
+    """
+    if cursor:
+        stmt = _seek_after(stmt, *decode_cursor(cursor))
+    rows = db.session.execute(stmt.limit(limit + 1)).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].account_created, rows[-1].id)
+    return [_user_dict(row) for row in rows], next_cursor
+
+
+def export_users(stmt, export_format, batch_size=1000):
+    """
+    Yield the users selected by stmt as CSV or NDJSON text chunks.
+    Rows are fetched in keyset batches of batch_size rather than through one
+    result set, because neither pysqlite nor mysqlconnector supports
+    server-side cursors and would buffer every matching row in memory.
+    """
+    buffer = io.StringIO()
+    writer = None
+    if export_format == "csv":
+        writer = csv.writer(buffer)
+        writer.writerow(EXPORT_FIELDS)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+    batch_stmt = stmt
+    while True:
+        batch = db.session.execute(batch_stmt.limit(batch_size)).all()
+        for row in batch:
+            if writer:
+                writer.writerow(_user_dict(row).values())
+            else:
+                buffer.write(json.dumps(_user_dict(row)))
+                buffer.write("\n")
+        if batch:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        if len(batch) < batch_size:
+            break
+        batch_stmt = _seek_after(stmt, batch[-1].account_created, batch[-1].id)
+
+
+def _seek_after(stmt, account_created, user_id):
+    # The leading >= bound lets the database range-scan the composite index
+    # instead of evaluating the OR against every row.
+    return stmt.where(and_(
+        User.account_created >= account_created,
+        or_(User.account_created > account_created, User.id > user_id),
+    ))
+
+
+def _user_dict(row):
+    user = dict(row._mapping)
+    user["account_created"] = user["account_created"].isoformat()
+    user["account_updated"] = user["account_updated"].isoformat()
+    return user